@@ -1,4 +1,4 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import os
 import httpx
 from dotenv import load_dotenv
@@ -6,10 +6,14 @@ from dotenv import load_dotenv
 # Load environment variables from parent directory .env file
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '.env'))
 
+# Keep-alive pool shared by every request so calls reuse TCP/TLS connections
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=50)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
 # Initialize OpenAI client with standard OpenAI API
 try:
     # Create httpx client without proxy settings
-    http_client = httpx.Client()
+    http_client = httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
     client = OpenAI(
         api_key=os.getenv("OPENAI_API_KEY"),
         http_client=http_client
@@ -21,38 +25,45 @@ except Exception as e:
         api_key=os.getenv("OPENAI_API_KEY")
     )
 
-def get_reasoning_response(user_input: str) -> tuple[str, str]:
-    """
-    Get reasoning response from DeepSeek model via OpenRouter.
-    Returns a tuple of (thoughts, response) where thoughts are the model's reasoning process
-    and response is the final answer.
-    """
-    completion = client.chat.completions.create(
-        model="gpt-3.5-turbo",  # Using OpenAI GPT-3.5 model
-        messages=[
-            {
-                "role": "system",
-                "content": """You are a reasoning agent that thinks step by step.
+# Async client for event-loop based workers
+try:
+    async_http_client = httpx.AsyncClient(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    async_client = AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=async_http_client
+    )
+except Exception as e:
+    print(f"Error initializing async OpenAI client: {e}")
+    async_client = AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY")
+    )
+
+SYSTEM_PROMPT = """You are a reasoning agent that thinks step by step.
                 Format your response as follows:
                 <think>
                 [Your step-by-step reasoning process here]
                 </think>
                 [Your final answer here]"""
-            },
-            {
-                "role": "user",
-                "content": user_input
-            }
-        ]
-    )
 
-    response_text = completion.choices[0].message.content
-    
+def _build_messages(user_input: str) -> list[dict]:
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": user_input
+        }
+    ]
+
+def _split_thinking(response_text: str, user_input: str) -> tuple[str, str]:
     # Check if the response uses the expected <think></think> format
     if "<think>" in response_text and "</think>" in response_text:
-        split_text = response_text.split("</think>")
-        thoughts = split_text[0].replace("<think>", "").strip()
-        response = split_text[1].strip() if len(split_text) > 1 else ""
+        # partition stops at the first closing tag instead of splitting the whole text
+        head, _, tail = response_text.partition("</think>")
+        thoughts = head.replace("<think>", "").strip()
+        response = tail.strip()
     else:
         # Fallback: if model doesn't use expected format, treat the entire response as the answer
         # and create a simple reasoning note
@@ -61,6 +72,31 @@ def get_reasoning_response(user_input: str) -> tuple[str, str]:
 
     return thoughts, response
 
+def get_reasoning_response(user_input: str) -> tuple[str, str]:
+    """
+    Get reasoning response from DeepSeek model via OpenRouter.
+    Returns a tuple of (thoughts, response) where thoughts are the model's reasoning process
+    and response is the final answer.
+    """
+    completion = client.chat.completions.create(
+        model="gpt-3.5-turbo",  # Using OpenAI GPT-3.5 model
+        messages=_build_messages(user_input)
+    )
+
+    return _split_thinking(completion.choices[0].message.content, user_input)
+
+async def get_reasoning_response_async(user_input: str) -> tuple[str, str]:
+    """
+    Async variant of get_reasoning_response for event-loop based workers.
+    Concurrent calls share the async client's connection pool.
+    """
+    completion = await async_client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=_build_messages(user_input)
+    )
+
+    return _split_thinking(completion.choices[0].message.content, user_input)
+
 if __name__ == "__main__":
     # Test the implementation
     user_input = input("Enter your question: ")
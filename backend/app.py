@@ -1,218 +1,392 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
+from functools import wraps
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from flask_compress import Compress
 import os
-import json
+import hashlib
+import threading
+import orjson
+from neo4j.time import Date, DateTime, Time
 from datetime import datetime
 from kgbuilder import AgentThinkingKG
 from services.galileo_service import get_galileo_service
+from services.cache_service import TTLCache
 from dotenv import load_dotenv
 
 # Load environment variables from parent directory
 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
 
+# Neo4j temporal values orjson cannot encode natively
+_NEO4J_TEMPORAL = (DateTime, Date, Time)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that encodes and decodes with orjson"""
+
+    @staticmethod
+    def default(o):
+        # Only reached for types orjson does not handle itself
+        if isinstance(o, _NEO4J_TEMPORAL):
+            return o.iso_format()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        # Flask's indent/sort_keys arguments are ignored; output is always compact.
+        # OPT_NON_STR_KEYS keeps stdlib json's support for int/None dict keys.
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for all routes
 
+class CompressedGraphCache:
+    """Flask-Compress cache backend that keeps only compressed /api/graph-data bodies"""
+
+    def __init__(self):
+        self._cache = TTLCache(maxsize=32, ttl=60)
+
+    def get(self, key):
+        # Keys are '<algorithm>;<compress_cache_key()>'; an empty request part means "don't cache"
+        return None if key.endswith(';') else self._cache.get(key)
+
+    def set(self, key, value):
+        if not key.endswith(';'):
+            self._cache.set(key, value)
+
+    def clear(self):
+        self._cache.clear()
+
+def compress_cache_key(req):
+    """Key compressed graph-data bodies by their content hash; leave every other response uncached"""
+    return g.get('graph_data_etag', '') if req.endpoint == 'get_graph_data' else ''
+
+# Compress JSON responses (graph data repeats the same keys on every node)
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_LEVEL'] = 4
+app.config['COMPRESS_CACHE_BACKEND'] = CompressedGraphCache
+app.config['COMPRESS_CACHE_KEY'] = compress_cache_key
+compress = Compress(app)
+
 # Initialize the knowledge graph system
 kg_system = None
+_kg_system_lock = threading.Lock()
+
+# Galileo/OpenAI service, bound once at startup by init_kg_system()
+galileo_service = None
+
+def current_galileo_service():
+    """Return the bound Galileo service, binding it here when init_kg_system() never ran (e.g. flask run)"""
+    global galileo_service
+    if galileo_service is None:
+        galileo_service = get_galileo_service()
+    return galileo_service
+
+# Bumped on every knowledge graph mutation so cached reads go stale immediately
+_graph_version = 0
+_graph_version_lock = threading.Lock()
+
+# Exact-match cache of LLM replies keyed by message text; off unless CHAT_CACHE_TTL > 0
+CHAT_CACHE_TTL = float(os.environ.get('CHAT_CACHE_TTL', 0))
+chat_response_cache = TTLCache(maxsize=int(os.environ.get('CHAT_CACHE_SIZE', 256)), ttl=CHAT_CACHE_TTL)
+
+# Pagination defaults for /api/sessions
+SESSIONS_PAGE_SIZE = 50
+SESSIONS_MAX_PAGE_SIZE = 500
+
+# Largest node page /api/graph-data will return when ?size is given
+GRAPH_MAX_PAGE_SIZE = 10000
+
+# Node (size, color) for the 3d-force-graph view, one lookup per node
+NODE_STYLES = {
+    'Session': (10, '#4A90E2'),
+    'Thought': (5, '#357ABD'),
+    'Entity': (5, '#50C878'),
+    'Tool': (5, '#FF6B6B'),
+    'unknown': (5, '#888888')
+}
+DEFAULT_NODE_STYLE = (5, '#888888')
+
+# Lifetime of the graph-versioned response caches below. The version counter is per process,
+# so multi-worker servers must set this to 0 (gunicorn.conf.py does) or workers serve stale graphs.
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 60))
+
+# Serialized /api/patterns responses keyed by graph version
+patterns_cache = TTLCache(maxsize=16, ttl=RESPONSE_CACHE_TTL)
+
+# Serialized /api/graph-data (body, etag) keyed by graph version and page
+graph_data_cache = TTLCache(maxsize=16, ttl=RESPONSE_CACHE_TTL)
+
+# Serialized /api/session/<id> responses keyed by (session id, graph version)
+session_cache = TTLCache(maxsize=256, ttl=RESPONSE_CACHE_TTL)
 
 def init_kg_system():
     """Initialize the knowledge graph system"""
-    global kg_system
+    global kg_system, galileo_service
+    with _kg_system_lock:
+        galileo_service = get_galileo_service()
+        
+        # The Neo4j driver owns the connection pool; never create a second one
+        if kg_system is not None:
+            return
+        try:
+            kg_system = AgentThinkingKG()
+            kg_system.add_change_listener(bump_graph_version)
+            print("Knowledge graph system initialized successfully")
+        except Exception as e:
+            print(f"Failed to initialize knowledge graph system: {e}")
+            print("Running in simplified mode without knowledge graph")
+            kg_system = None
+
+def bump_graph_version(session_id=None):
+    """Graph change listener: mark the knowledge graph as changed, invalidating cached reads"""
+    global _graph_version
+    with _graph_version_lock:
+        _graph_version += 1
+    flush_response_caches()
+
+def flush_response_caches():
+    """Drop all cached /api/patterns, /api/graph-data and /api/session responses"""
+    patterns_cache.clear()
+    graph_data_cache.clear()
+    session_cache.clear()
+    compress.cache.clear()
+
+def handle_api_errors(view):
+    """Turn unhandled exceptions in a route into a JSON 500 response"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            return view(*args, **kwargs)
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    return wrapper
+
+def require_kg_system(view):
+    """Reject the request with a 500 when the knowledge graph is unavailable"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not kg_system:
+            return jsonify({'error': 'Knowledge graph system not initialized'}), 500
+        return view(*args, **kwargs)
+    return wrapper
+
+def fast_json_body():
+    """Decode the request body as a JSON object with orjson, or return None"""
     try:
-        kg_system = AgentThinkingKG()
-        print("Knowledge graph system initialized successfully")
-    except Exception as e:
-        print(f"Failed to initialize knowledge graph system: {e}")
-        print("Running in simplified mode without knowledge graph")
-        kg_system = None
+        data = orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    # One timestamp for the whole response
+    timestamp = datetime.now().isoformat()
+    
     # Get Galileo service health
-    galileo_service = get_galileo_service()
-    galileo_health = galileo_service.health_check()
+    galileo_health = current_galileo_service().health_check(timestamp)
     
     return jsonify({
         'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': timestamp,
         'kg_system_initialized': kg_system is not None,
         'galileo_service': galileo_health
     })
 
 @app.route('/api/chat', methods=['POST'])
+@handle_api_errors
 def chat_with_agent():
     """Chat with the agent and process the response"""
-    try:
-        data = request.get_json()
-        user_message = data.get('message', '')
-        session_id = data.get('session_id')
-        
-        if not user_message:
-            return jsonify({'error': 'message is required'}), 400
-        
-        # Get response from the agent with Galileo evaluation
-        galileo_service = get_galileo_service()
-        thoughts, response, evaluation_metadata = galileo_service.get_reasoning_response_with_evaluation(
+    data = fast_json_body()
+    if data is None:
+        return jsonify({'error': 'request body must be a JSON object'}), 400
+    user_message = data.get('message', '')
+    session_id = data.get('session_id')
+    
+    if not user_message:
+        return jsonify({'error': 'message is required'}), 400
+    
+    # Get response from the agent with Galileo evaluation, unless an identical message was just answered
+    cached = chat_response_cache.get(user_message) if CHAT_CACHE_TTL > 0 else None
+    if cached is None:
+        thoughts, response, evaluation_metadata = current_galileo_service().get_reasoning_response_with_evaluation(
             user_message, session_id
         )
-        
-        # Process the agent's thinking into the knowledge graph (if available)
-        result_session_id = session_id
-        if kg_system:
-            try:
-                result_session_id = kg_system.process_thinking(thoughts, session_id)
-            except Exception as e:
-                print(f"Warning: Failed to process thinking in KG: {e}")
-                # Continue without KG processing
-        
-        return jsonify({
-            'success': True,
-            'session_id': result_session_id,
-            'thoughts': thoughts,
-            'response': response,
-            'message': 'Chat processed successfully',
-            'kg_enabled': kg_system is not None,
-            'evaluation': {
-                'galileo_enabled': evaluation_metadata.get('galileo_enabled', False),
-                'evaluation_scores': evaluation_metadata.get('evaluation_scores', {}),
-                'evaluation_feedback': evaluation_metadata.get('evaluation_feedback', {}),
-                'self_evaluation': evaluation_metadata.get('self_evaluation', {}),
-                'galileo_trace_id': evaluation_metadata.get('galileo_trace_id'),
-                'service_version': evaluation_metadata.get('service_version', '1.0.0')
-            }
-        })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        if CHAT_CACHE_TTL > 0:
+            chat_response_cache.set(user_message, (thoughts, response, evaluation_metadata))
+    else:
+        thoughts, response, evaluation_metadata = cached
+    
+    # Process the agent's thinking into the knowledge graph (if available)
+    result_session_id = session_id
+    if kg_system:
+        try:
+            result_session_id = kg_system.process_thinking(thoughts, session_id)
+        except Exception as e:
+            print(f"Warning: Failed to process thinking in KG: {e}")
+            # Continue without KG processing
+    
+    return jsonify({
+        'success': True,
+        'session_id': result_session_id,
+        'thoughts': thoughts,
+        'response': response,
+        'message': 'Chat processed successfully',
+        'kg_enabled': kg_system is not None,
+        'evaluation': {
+            'galileo_enabled': evaluation_metadata.get('galileo_enabled', False),
+            'evaluation_scores': evaluation_metadata.get('evaluation_scores', {}),
+            'evaluation_feedback': evaluation_metadata.get('evaluation_feedback', {}),
+            'self_evaluation': evaluation_metadata.get('self_evaluation', {}),
+            'galileo_trace_id': evaluation_metadata.get('galileo_trace_id'),
+            'service_version': evaluation_metadata.get('service_version', '1.0.0')
+        }
+    })
 
 @app.route('/api/process-thinking', methods=['POST'])
+@handle_api_errors
+@require_kg_system
 def process_thinking():
     """Process thinking text and add to knowledge graph"""
-    try:
-        data = request.get_json()
-        thinking_text = data.get('thinking_text', '')
-        session_id = data.get('session_id')
-        
-        if not thinking_text:
-            return jsonify({'error': 'thinking_text is required'}), 400
-        
-        if not kg_system:
-            return jsonify({'error': 'Knowledge graph system not initialized'}), 500
-        
-        # Process the thinking text
-        result_session_id = kg_system.process_thinking(thinking_text, session_id)
-        
-        return jsonify({
-            'success': True,
-            'session_id': result_session_id,
-            'message': 'Thinking processed successfully'
-        })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    data = fast_json_body()
+    if data is None:
+        return jsonify({'error': 'request body must be a JSON object'}), 400
+    thinking_text = data.get('thinking_text', '')
+    session_id = data.get('session_id')
+    
+    if not thinking_text:
+        return jsonify({'error': 'thinking_text is required'}), 400
+    
+    # Process the thinking text
+    result_session_id = kg_system.process_thinking(thinking_text, session_id)
+    
+    return jsonify({
+        'success': True,
+        'session_id': result_session_id,
+        'message': 'Thinking processed successfully'
+    })
 
 @app.route('/api/graph-data', methods=['GET'])
+@handle_api_errors
+@require_kg_system
 def get_graph_data():
-    """Get knowledge graph data for visualization"""
-    try:
-        if not kg_system:
-            return jsonify({'error': 'Knowledge graph system not initialized'}), 500
-        
-        graph_data = kg_system.get_full_graph_data()
-        
-        # Transform the data for 3d-force-graph format
-        nodes = []
-        links = []
-        
-        for node in graph_data['nodes']:
-            nodes.append({
-                'id': node['id'],
-                'name': node['label'],
-                'type': node['type'],
-                'val': 10 if node['type'] == 'Session' else 5,  # Size based on type
-                'color': get_node_color(node['type'])
-            })
-        
-        for link in graph_data['links']:
-            links.append({
-                'source': link['source'],
-                'target': link['target'],
-                'type': link['type'],
-                'value': link.get('strength', 1.0)
-            })
-        
-        return jsonify({
-            'nodes': nodes,
-            'links': links
-        })
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    """Get knowledge graph data for visualization (supports If-None-Match, optional ?page=1&size=N)"""
+    size = request.args.get('size', type=int)
+    if size is not None:
+        size = min(max(size, 1), GRAPH_MAX_PAGE_SIZE)
+        page = max(request.args.get('page', 1, type=int), 1)
+        skip = (page - 1) * size
+    else:
+        skip = 0
+    
+    cache_key = (_graph_version, skip, size)
+    cached = graph_data_cache.get(cache_key)
+    if cached is None:
+        body = build_graph_data_body(skip=skip, limit=size)
+        # Content hash, so the ETag stays valid across restarts and worker processes
+        cached = (body, hashlib.blake2b(body, digest_size=16).hexdigest())
+        graph_data_cache.set(cache_key, cached)
+    
+    body, etag = cached
+    if etag_matches(etag):
+        # Answer revalidation before building (and compressing) the full response
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    
+    g.graph_data_etag = etag
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+def etag_matches(etag):
+    """True if If-None-Match names etag, bare or with Flask-Compress's ':br'/':gzip' suffix"""
+    if_none_match = request.if_none_match
+    return any(if_none_match.contains_weak(etag + suffix) for suffix in ('', ':br', ':gzip'))
+
+def build_graph_data_body(skip=0, limit=None):
+    """Fetch the graph (or one page of it) and serialize it in 3d-force-graph format"""
+    graph_data = kg_system.get_full_graph_data(skip=skip, limit=limit)
+    
+    # Transform the data for 3d-force-graph format
+    nodes = [graph_node(node) for node in graph_data['nodes']]
+    links = [
+        {
+            'source': link['source'],
+            'target': link['target'],
+            'type': link['type'],
+            'value': link.get('strength', 1.0)
+        }
+        for link in graph_data['links']
+    ]
+    
+    # Largest payload the API emits: serialize straight to bytes, skipping jsonify
+    return orjson.dumps({'nodes': nodes, 'links': links})
+
+def graph_node(node):
+    """Format one node for 3d-force-graph, sized and colored by type"""
+    val, color = NODE_STYLES.get(node['type'], DEFAULT_NODE_STYLE)
+    return {
+        'id': node['id'],
+        'name': node['label'],
+        'type': node['type'],
+        'val': val,
+        'color': color
+    }
 
 @app.route('/api/sessions', methods=['GET'])
+@handle_api_errors
+@require_kg_system
 def get_sessions():
-    """Get all sessions in the knowledge graph"""
-    try:
-        if not kg_system:
-            return jsonify({'error': 'Knowledge graph system not initialized'}), 500
-        
-        sessions = kg_system.get_session_info()
-        return jsonify({'sessions': sessions})
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    """Get one page of sessions in the knowledge graph (?page=1&size=50)"""
+    page = max(request.args.get('page', 1, type=int), 1)
+    size = min(max(request.args.get('size', SESSIONS_PAGE_SIZE, type=int), 1), SESSIONS_MAX_PAGE_SIZE)
+    
+    # One extra row tells the client whether another page exists
+    sessions = kg_system.get_session_info(skip=(page - 1) * size, limit=size + 1)
+    has_more = len(sessions) > size
+    return jsonify({'sessions': sessions[:size], 'page': page, 'size': size, 'has_more': has_more})
 
 @app.route('/api/session/<session_id>', methods=['GET'])
+@handle_api_errors
+@require_kg_system
 def get_session_details(session_id):
     """Get detailed information about a specific session"""
-    try:
-        if not kg_system:
-            return jsonify({'error': 'Knowledge graph system not initialized'}), 500
-        
+    cache_key = (session_id, _graph_version)
+    body = session_cache.get(cache_key)
+    if body is None:
         session_info = kg_system.get_session_info(session_id)
-        return jsonify({'session': session_info})
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        body = jsonify({'session': session_info}).get_data()
+        session_cache.set(cache_key, body)
+    
+    return app.response_class(body, mimetype='application/json')
 
 @app.route('/api/patterns', methods=['GET'])
+@handle_api_errors
+@require_kg_system
 def get_patterns():
     """Get reasoning patterns analysis"""
-    try:
-        if not kg_system:
-            return jsonify({'error': 'Knowledge graph system not initialized'}), 500
-        
+    cache_key = _graph_version
+    body = patterns_cache.get(cache_key)
+    if body is None:
         patterns = kg_system.analyze_patterns()
-        return jsonify(patterns)
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        body = jsonify(patterns).get_data()
+        patterns_cache.set(cache_key, body)
+    
+    return app.response_class(body, mimetype='application/json')
 
 @app.route('/api/clear-database', methods=['DELETE'])
+@handle_api_errors
+@require_kg_system
 def clear_database():
     """Clear all data from the knowledge graph (use with caution)"""
-    try:
-        if not kg_system:
-            return jsonify({'error': 'Knowledge graph system not initialized'}), 500
-        
-        kg_system.clear_database()
-        return jsonify({'success': True, 'message': 'Database cleared successfully'})
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-def get_node_color(node_type):
-    """Get color for different node types"""
-    color_map = {
-        'Session': '#4A90E2',
-        'Thought': '#357ABD', 
-        'Entity': '#50C878',
-        'Tool': '#FF6B6B',
-        'unknown': '#888888'
-    }
-    return color_map.get(node_type, '#888888')
+    kg_system.clear_database()
+    return jsonify({'success': True, 'message': 'Database cleared successfully'})
 
 @app.errorhandler(404)
 def not_found(error):
@@ -235,8 +409,10 @@ if __name__ == '__main__':
         print(f" * Running on all addresses (0.0.0.0)")
         print(f" * Running on http://127.0.0.1:{port}")
         print(f" * Running on http://192.0.0.2:{port}")
-        print(f" * Production server starting on port {port}")
-        serve(app, host='0.0.0.0', port=port)
+        # Chat requests spend seconds waiting on the LLM; size the thread pool for I/O, not CPU
+        threads = int(os.environ.get('WAITRESS_THREADS', 16))
+        print(f" * Production server starting on port {port} with {threads} threads")
+        serve(app, host='0.0.0.0', port=port, threads=threads)
     except ImportError:
         print("Waitress not installed, falling back to Flask dev server")
         app.run(debug=False, host='0.0.0.0', port=port)
\ No newline at end of file
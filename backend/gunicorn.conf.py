@@ -0,0 +1,44 @@
+"""
+Gunicorn configuration for running the backend with one process per core.
+
+Usage (from the backend directory):
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+import multiprocessing
+from dotenv import load_dotenv
+
+# Same project .env as app.py, so BACKEND_PORT and the GUNICORN_* settings apply here too
+load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
+
+bind = f"0.0.0.0:{os.environ.get('BACKEND_PORT', os.environ.get('PORT', 8000))}"
+
+# One worker process per core for CPU-bound work (graph-data encoding), threads for LLM I/O waits
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# LLM calls can take well over gunicorn's default 30s
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+
+def on_starting(server):
+    """Disable the graph-versioned response caches before forking several workers"""
+    # Graph mutations only invalidate the worker that handled them, so with several workers the
+    # caches would serve stale data (e.g. the graph refetch after a chat). server.cfg has -w and
+    # GUNICORN_CMD_ARGS applied; workers inherit this environment.
+    if server.cfg.workers > 1:
+        os.environ['RESPONSE_CACHE_TTL'] = '0'
+
+
+def post_worker_init(worker):
+    """Give each worker its own Neo4j driver and Galileo service after the fork"""
+    from app import init_kg_system
+    init_kg_system()
+
+
+def worker_exit(server, worker):
+    """Flush queued Galileo traces before a worker goes away"""
+    from services.galileo_service import get_galileo_service
+    get_galileo_service().drain_log_queue()
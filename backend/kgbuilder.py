@@ -1,9 +1,10 @@
 import os
 import re
+import asyncio
 import json
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable
 from dataclasses import dataclass
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, READ_ACCESS, Query, unit_of_work
 import google.generativeai as genai
 from datetime import datetime
 from dotenv import load_dotenv
@@ -17,6 +18,227 @@ if not gemini_api_key:
     raise ValueError("GEMINI_API_KEY environment variable is not set")
 genai.configure(api_key=gemini_api_key)
 
+# Cypher queries live at module level so every call sends byte-identical text
+# and the server can reuse its cached execution plan.
+_SCHEMA_QUERIES = (
+    "CREATE CONSTRAINT thought_id IF NOT EXISTS FOR (t:Thought) REQUIRE t.id IS UNIQUE",
+    "CREATE CONSTRAINT session_id IF NOT EXISTS FOR (s:Session) REQUIRE s.id IS UNIQUE",
+    "CREATE CONSTRAINT entity_name IF NOT EXISTS FOR (e:Entity) REQUIRE e.name IS UNIQUE",
+    "CREATE CONSTRAINT tool_name IF NOT EXISTS FOR (t:Tool) REQUIRE t.name IS UNIQUE",
+    # Range indexes for timestamp ordering and filtering
+    "CREATE INDEX session_timestamp IF NOT EXISTS FOR (s:Session) ON (s.timestamp)",
+    "CREATE INDEX thought_timestamp IF NOT EXISTS FOR (t:Thought) ON (t.timestamp)"
+)
+
+# Existing session and its thought count; no row when the session does not exist
+_SESSION_EXISTS_Q = """
+    MATCH (s:Session {id: $session_id})
+    OPTIONAL MATCH (s)-[:CONTAINS]->(t:Thought)
+    RETURN s.id as id, count(t) as thought_count
+"""
+
+_DELETE_SESSION_Q = """
+    MATCH (s:Session {id: $session_id})
+    OPTIONAL MATCH (s)-[:CONTAINS]->(t:Thought)
+    DETACH DELETE t, s
+"""
+
+# Delete a session's thoughts in server-side batches so large overwrites never hold every lock at once
+_BATCH_DELETE_THOUGHTS_Q = """
+    CALL apoc.periodic.iterate(
+        'MATCH (:Session {id: $session_id})-[:CONTAINS]->(t:Thought) RETURN t',
+        'DETACH DELETE t',
+        {batchSize: 5000, params: {session_id: $session_id}}
+    )
+"""
+
+# Overwrites with fewer thoughts than this delete inside the (atomic) write transaction
+_BATCH_DELETE_MIN_THOUGHTS = int(os.getenv('NEO4J_BATCH_DELETE_MIN_THOUGHTS', 5000))
+
+# Returned by the write transaction when an overwrite is too large to delete inside it
+_NEEDS_BATCH_DELETE = object()
+
+_APOC_PROBE_Q = """
+    SHOW PROCEDURES YIELD name
+    WHERE name = 'apoc.periodic.iterate'
+    RETURN count(*) > 0 as available
+"""
+
+_MERGE_SESSION_Q = """
+    MERGE (s:Session {id: $session_id})
+    SET s.raw_text = $thinking_text,
+        s.reasoning_strategy = $strategy,
+        s.domain = $domain,
+        s.timestamp = datetime(),
+        s.success_indicators = $success_indicators
+"""
+
+# Batched writes: each query UNWINDs one list of rows for the whole session
+_MERGE_THOUGHTS_Q = """
+    MATCH (s:Session {id: $session_id})
+    UNWIND $thoughts AS row
+    MERGE (t:Thought {id: row.id})
+    SET t.content = row.content,
+        t.type = row.type,
+        t.confidence = row.confidence,
+        t.session_id = $session_id,
+        t.sequence_order = row.order,
+        t.timestamp = datetime()
+    MERGE (s)-[:CONTAINS]->(t)
+"""
+
+# Entity and tool nodes are merged once per distinct name; the link queries then only MATCH them
+_MERGE_ENTITY_NAMES_Q = """
+    UNWIND $names AS name
+    MERGE (:Entity {name: name})
+"""
+
+_MERGE_TOOL_NAMES_Q = """
+    UNWIND $names AS name
+    MERGE (:Tool {name: name})
+"""
+
+_MERGE_ENTITIES_Q = """
+    UNWIND $mentions AS row
+    MATCH (t:Thought {id: row.thought_id})
+    MATCH (e:Entity {name: row.name})
+    MERGE (t)-[:MENTIONS]->(e)
+"""
+
+_MERGE_TOOLS_Q = """
+    UNWIND $uses AS row
+    MATCH (t:Thought {id: row.thought_id})
+    MATCH (tool:Tool {name: row.name})
+    MERGE (t)-[:USES_TOOL]->(tool)
+"""
+
+_MERGE_FLOWS_Q = """
+    UNWIND $flows AS row
+    MATCH (source:Thought {id: row.source_id})
+    MATCH (target:Thought {id: row.target_id})
+    MERGE (source)-[r:REASONING_FLOW {type: row.rel_type}]->(target)
+    SET r.strength = row.strength
+"""
+
+_REASONING_PATTERNS_Q = """
+    MATCH (s:Session)
+    RETURN s.reasoning_strategy as strategy, 
+           s.domain as domain,
+           count(s) as frequency
+    ORDER BY frequency DESC
+"""
+
+_SUCCESSFUL_PATTERNS_Q = """
+    MATCH (s:Session)-[:CONTAINS]->(t:Thought)
+    WHERE size(s.success_indicators) > 0
+    WITH s.reasoning_strategy as strategy, s.success_indicators as indicators,
+         collect(t.type) as thought_sequence
+    RETURN strategy, thought_sequence, indicators, count(*) as frequency
+    ORDER BY frequency DESC
+"""
+
+_TOOL_USAGE_PATTERNS_Q = """
+    MATCH (t:Thought)-[:USES_TOOL]->(tool:Tool)
+    WITH tool.name as tool_name, 
+         collect(t.type) as thought_types,
+         count(t) as usage_count
+    RETURN tool_name, thought_types, usage_count
+    ORDER BY usage_count DESC
+"""
+
+_SESSION_DETAIL_Q = """
+    MATCH (s:Session {id: $session_id})-[:CONTAINS]->(t:Thought)
+    RETURN s.id as session_id, s.reasoning_strategy as strategy,
+           collect(t.content) as thoughts
+"""
+
+# Page over sessions first so thoughts are only counted for the page
+_SESSION_PAGE_Q = """
+    MATCH (s:Session)
+    WITH s ORDER BY s.timestamp DESC SKIP $skip LIMIT $limit
+    OPTIONAL MATCH (s)-[:CONTAINS]->(t:Thought)
+    WITH s, count(t) as thought_count
+    RETURN s.id as session_id, s.reasoning_strategy as strategy,
+           thought_count, toString(s.timestamp) as timestamp
+    ORDER BY s.timestamp DESC
+"""
+
+_SESSION_LIST_Q = """
+    MATCH (s:Session)
+    OPTIONAL MATCH (s)-[:CONTAINS]->(t:Thought)
+    WITH s, count(t) as thought_count
+    RETURN s.id as session_id, s.reasoning_strategy as strategy,
+           thought_count, toString(s.timestamp) as timestamp
+    ORDER BY s.timestamp DESC
+"""
+
+# Only the fields the visualization needs; whole nodes would also ship raw_text
+_ALL_NODES_Q = """
+    MATCH (n)
+    RETURN elementId(n) as id,
+           coalesce(n.name, n.content, elementId(n)) as label,
+           coalesce(head(labels(n)), 'unknown') as type
+"""
+
+# Project only the endpoint ids instead of returning whole nodes
+_ALL_LINKS_Q = """
+    MATCH (n)-[r]->(m)
+    RETURN elementId(n) as source, elementId(m) as target,
+           type(r) as type, coalesce(r.strength, 1.0) as strength
+"""
+
+# One page of nodes in stable elementId order, and the links leaving those nodes
+_NODE_PAGE_Q = """
+    MATCH (n)
+    WITH n ORDER BY elementId(n) SKIP $skip LIMIT $limit
+    RETURN elementId(n) as id,
+           coalesce(n.name, n.content, elementId(n)) as label,
+           coalesce(head(labels(n)), 'unknown') as type
+"""
+
+_LINK_PAGE_Q = """
+    MATCH (n)-[r]->(m)
+    WHERE elementId(n) IN $ids
+    RETURN elementId(n) as source, elementId(m) as target,
+           type(r) as type, coalesce(r.strength, 1.0) as strength
+"""
+
+# Delete in server-side batches so a large graph never builds one huge transaction
+_CLEAR_DATABASE_Q = Query("""
+    MATCH (n)
+    CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS
+""", metadata={'op': 'clear_database'})
+
+# Server-side timeout for read transactions; metadata tags each one for query logs
+_READ_TIMEOUT = float(os.getenv('NEO4J_QUERY_TIMEOUT', 60))
+
+# Fallback analysis patterns, compiled once
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+
+# Keyword substring tests per thought type, in priority order
+_THOUGHT_TYPE_RES = (
+    (re.compile(r'observe|see|notice|found', re.IGNORECASE), 'observation'),
+    (re.compile(r'analyze|determine|identify', re.IGNORECASE), 'analysis'),
+    (re.compile(r'decide|choose|will', re.IGNORECASE), 'decision'),
+    (re.compile(r'call|execute|run|invoke', re.IGNORECASE), 'action'),
+)
+
+# Decodes the first JSON value in model output, ignoring fences and trailing text
+_JSON_DECODER = json.JSONDecoder()
+
+# Entity candidates: function-like names (camelCase or snake_case) and quoted strings
+_FUNCTION_NAME_RE = re.compile(r'\b[a-z][a-zA-Z0-9_]*(?:[A-Z][a-z]*)*\b')
+_QUOTED_RE = re.compile(r"'([^']*)'|\"([^\"]*)\"")
+
+# Common API/tool patterns
+_TOOL_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'\w+API',
+    r'\w+_api',
+    r'default_api',
+    r'\w+Tool',
+    r'\w+Service'
+))
+
 
 @dataclass
 class ThoughtNode:
@@ -47,8 +269,26 @@ class ThinkingAnalyzer:
 
     def analyze_thinking_text(self, thinking_text: str) -> Dict[str, Any]:
         """Use Gemini to analyze the thinking text and extract structured data"""
+        try:
+            response = self.model.generate_content(self._build_prompt(thinking_text))
+            return self._parse_response(response.text)
+        except Exception as e:
+            print(f"Error analyzing with Gemini: {e}")
+            return self._fallback_analysis(thinking_text)
 
-        prompt = f"""
+    async def aanalyze_thinking_text(self, thinking_text: str) -> Dict[str, Any]:
+        """Async variant of analyze_thinking_text so callers can overlap Gemini round-trips"""
+        try:
+            response = await self.model.generate_content_async(self._build_prompt(thinking_text))
+            return self._parse_response(response.text)
+        except Exception as e:
+            print(f"Error analyzing with Gemini: {e}")
+            return self._fallback_analysis(thinking_text)
+
+    @staticmethod
+    def _build_prompt(thinking_text: str) -> str:
+        """Build the Gemini extraction prompt for a thinking text"""
+        return f"""
         Analyze this agent thinking process and extract structured information:
 
         Text: "{thinking_text}"
@@ -87,33 +327,28 @@ class ThinkingAnalyzer:
         - Classify the overall reasoning strategy
         """
 
-        try:
-            response = self.model.generate_content(prompt)
-            # Clean the response to extract JSON
-            response_text = response.text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:-3]
-            elif response_text.startswith('```'):
-                response_text = response_text[3:-3]
-
-            return json.loads(response_text)
-        except Exception as e:
-            print(f"Error analyzing with Gemini: {e}")
-            return self._fallback_analysis(thinking_text)
+    @staticmethod
+    def _parse_response(response_text: str) -> Dict[str, Any]:
+        """Decode the JSON object in a Gemini response, wherever its code fence puts it"""
+        start = response_text.find('{')
+        if start < 0:
+            raise ValueError("No JSON object in Gemini response")
+
+        analyzed_data, _ = _JSON_DECODER.raw_decode(response_text, start)
+        return analyzed_data
 
     def _fallback_analysis(self, thinking_text: str) -> Dict[str, Any]:
         """Fallback analysis using regex patterns"""
-        sentences = re.split(r'[.!?]+', thinking_text)
-
         thoughts = []
-        for i, sentence in enumerate(sentences):
-            if sentence.strip():
+        for sentence in _SENTENCE_SPLIT_RE.split(thinking_text):
+            content = sentence.strip()
+            if content:
                 thought_type = self._classify_sentence(sentence)
                 entities = self._extract_entities(sentence)
                 tools = self._extract_tools(sentence)
 
                 thoughts.append({
-                    "content": sentence.strip(),
+                    "content": content,
                     "type": thought_type,
                     "entities": entities,
                     "tools_mentioned": tools,
@@ -140,208 +375,230 @@ class ThinkingAnalyzer:
 
     def _classify_sentence(self, sentence: str) -> str:
         """Simple classification of sentence type"""
-        sentence_lower = sentence.lower()
-        if any(word in sentence_lower for word in ['observe', 'see', 'notice', 'found']):
-            return 'observation'
-        elif any(word in sentence_lower for word in ['analyze', 'determine', 'identify']):
-            return 'analysis'
-        elif any(word in sentence_lower for word in ['decide', 'choose', 'will']):
-            return 'decision'
-        elif any(word in sentence_lower for word in ['call', 'execute', 'run', 'invoke']):
-            return 'action'
-        else:
-            return 'reflection'
+        # One case-insensitive scan per type instead of lowercasing and testing each keyword
+        for pattern, thought_type in _THOUGHT_TYPE_RES:
+            if pattern.search(sentence):
+                return thought_type
+        return 'reflection'
 
     def _extract_entities(self, text: str) -> List[str]:
         """Extract potential entities from text"""
         # Look for function names, parameters, quoted strings
-        entities = []
+        entities = set()
 
         # Function names (camelCase or snake_case)
-        functions = re.findall(r'\b[a-z][a-zA-Z0-9_]*(?:[A-Z][a-z]*)*\b', text)
-        entities.extend([f for f in functions if len(f) > 3])
+        entities.update(f for f in _FUNCTION_NAME_RE.findall(text) if len(f) > 3)
 
         # Quoted strings
-        quoted = re.findall(r"'([^']*)'|\"([^\"]*)\"", text)
-        entities.extend([q[0] or q[1] for q in quoted])
+        entities.update(q[0] or q[1] for q in _QUOTED_RE.findall(text))
 
-        return list(set(entities))
+        return list(entities)
 
     def _extract_tools(self, text: str) -> List[str]:
         """Extract tool/API mentions from text"""
-        tools = []
-
-        # Common API/tool patterns
-        tool_patterns = [
-            r'\w+API',
-            r'\w+_api',
-            r'default_api',
-            r'\w+Tool',
-            r'\w+Service'
-        ]
+        tools = set()
 
-        for pattern in tool_patterns:
-            tools.extend(re.findall(pattern, text, re.IGNORECASE))
+        for pattern in _TOOL_RES:
+            tools.update(pattern.findall(text))
 
-        return list(set(tools))
+        return list(tools)
 
 
 class KnowledgeGraphBuilder:
     """Builds and manages the Neo4j knowledge graph"""
 
     def __init__(self, uri: str, user: str, password: str):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        # One pooled driver per process; sessions borrow connections from it
+        self.driver = GraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=int(os.getenv('NEO4J_POOL_SIZE', 50)),
+            connection_acquisition_timeout=float(os.getenv('NEO4J_ACQ_TIMEOUT', 60)),
+            connection_timeout=5
+        )
+        # Records pulled per batch when streaming read results
+        self.fetch_size = int(os.getenv('NEO4J_FETCH_SIZE', 1000))
+        # Whether APOC batch deletes are available; probed on first overwrite
+        self._apoc_available: Optional[bool] = None
         self._create_constraints()
+        if os.getenv('NEO4J_WARMUP', 'true').lower() in ('true', '1', 'yes'):
+            self._warm_up()
 
     def _create_constraints(self):
         """Create necessary constraints and indexes"""
         with self.driver.session() as session:
-            # Create constraints
-            constraints = [
-                "CREATE CONSTRAINT thought_id IF NOT EXISTS FOR (t:Thought) REQUIRE t.id IS UNIQUE",
-                "CREATE CONSTRAINT session_id IF NOT EXISTS FOR (s:Session) REQUIRE s.id IS UNIQUE",
-                "CREATE CONSTRAINT entity_name IF NOT EXISTS FOR (e:Entity) REQUIRE e.name IS UNIQUE",
-                "CREATE CONSTRAINT tool_name IF NOT EXISTS FOR (t:Tool) REQUIRE t.name IS UNIQUE"
-            ]
-
-            for constraint in constraints:
+            # Create constraints; each in its own write transaction so one conflict doesn't abort the rest
+            for constraint in _SCHEMA_QUERIES:
                 try:
-                    session.run(constraint)
+                    session.execute_write(lambda tx, q=constraint: tx.run(q).consume())
                 except Exception as e:
                     print(f"Constraint creation note: {e}")
 
+    def _warm_up(self):
+        """Open a pooled connection and touch the session index so the first request isn't cold"""
+        try:
+            self.driver.verify_connectivity()
+            with self.read_session() as session:
+                session.execute_read(
+                    lambda tx: tx.run(_SESSION_PAGE_Q, skip=0, limit=1).consume()
+                )
+        except Exception as e:
+            print(f"Neo4j warm-up note: {e}")
+
     def add_thinking_session(self, session_id: str, thinking_text: str,
                              analyzed_data: Dict[str, Any], overwrite: bool = True) -> str:
-        """Add a complete thinking session to the knowledge graph"""
+        """Add a complete thinking session to the knowledge graph.
 
-        with self.driver.session() as session:
+        Normally the whole write, including deleting an overwritten session, is one
+        transaction. Overwriting a session with at least _BATCH_DELETE_MIN_THOUGHTS
+        thoughts on a server with APOC instead ends that transaction unwritten, deletes
+        the old thoughts in committed batches and writes again; if the write then fails,
+        the old session node is left without thoughts.
+        """
+        # Flatten the analysis into one row list per query
+        thought_ids = [f"{session_id}_thought_{i}" for i in range(len(analyzed_data['thoughts']))]
+        thoughts = []
+        mentions = []
+        uses = []
+        for i, (thought_id, thought) in enumerate(zip(thought_ids, analyzed_data['thoughts'])):
+            thoughts.append({'id': thought_id, 'content': thought['content'], 'type': thought['type'],
+                             'confidence': thought['confidence'], 'order': i})
+            mentions.extend({'thought_id': thought_id, 'name': entity} for entity in thought['entities'])
+            uses.extend({'thought_id': thought_id, 'name': tool} for tool in thought['tools_mentioned'])
+
+        # Distinct names, sorted so concurrent sessions take node locks in the same order
+        entity_names = sorted({row['name'] for row in mentions})
+        tool_names = sorted({row['name'] for row in uses})
+
+        flows = [{'source_id': thought_ids[rel['source_thought']],
+                  'target_id': thought_ids[rel['target_thought']],
+                  'rel_type': rel['relationship'], 'strength': rel['strength']}
+                 for rel in analyzed_data.get('relationships', [])]
+
+        @unit_of_work(metadata={'op': 'add_thinking_session'})
+        def write_session(tx, batch_deleted=False):
             # Check if session already exists and handle accordingly
-            existing_session = session.run("""
-                MATCH (s:Session {id: $session_id})
-                RETURN s.id as id
-            """, session_id=session_id).single()
+            existing_session = tx.run(_SESSION_EXISTS_Q, session_id=session_id).single()
 
             if existing_session and not overwrite:
                 print(f"Session {session_id} already exists. Use overwrite=True to replace it.")
-                return session_id
+                return
             elif existing_session and overwrite:
+                if (not batch_deleted
+                        and existing_session['thought_count'] >= _BATCH_DELETE_MIN_THOUGHTS
+                        and self._has_apoc()):
+                    # Nothing written yet; the caller batch-deletes the old thoughts and retries
+                    return _NEEDS_BATCH_DELETE
                 # Delete existing session and all related nodes
                 print(f"Overwriting existing session: {session_id}")
-                session.run("""
-                    MATCH (s:Session {id: $session_id})
-                    OPTIONAL MATCH (s)-[:CONTAINS]->(t:Thought)
-                    OPTIONAL MATCH (t)-[r1:MENTIONS|USES_TOOL|REASONING_FLOW]-()
-                    DELETE r1, t, s
-                """, session_id=session_id)
+                tx.run(_DELETE_SESSION_Q, session_id=session_id).consume()
 
             # Create session node
-            session.run("""
-                MERGE (s:Session {id: $session_id})
-                SET s.raw_text = $thinking_text,
-                    s.reasoning_strategy = $strategy,
-                    s.domain = $domain,
-                    s.timestamp = datetime(),
-                    s.success_indicators = $success_indicators
-            """, session_id=session_id, thinking_text=thinking_text,
-                        strategy=analyzed_data.get('reasoning_strategy', 'unknown'),
-                        domain=analyzed_data.get('domain', 'general'),
-                        success_indicators=analyzed_data.get('success_indicators', []))
-
-            # Create thought nodes
-            thought_ids = []
-            for i, thought in enumerate(analyzed_data['thoughts']):
-                thought_id = f"{session_id}_thought_{i}"
-                thought_ids.append(thought_id)
-
-                session.run("""
-                    MERGE (t:Thought {id: $thought_id})
-                    SET t.content = $content,
-                        t.type = $type,
-                        t.confidence = $confidence,
-                        t.session_id = $session_id,
-                        t.sequence_order = $order,
-                        t.timestamp = datetime()
-                """, thought_id=thought_id, content=thought['content'],
-                            type=thought['type'], confidence=thought['confidence'],
-                            session_id=session_id, order=i)
-
-                # Connect thought to session
-                session.run("""
-                    MATCH (s:Session {id: $session_id})
-                    MATCH (t:Thought {id: $thought_id})
-                    MERGE (s)-[:CONTAINS]->(t)
-                """, session_id=session_id, thought_id=thought_id)
-
-                # Create entity nodes and relationships
-                for entity in thought['entities']:
-                    session.run("""
-                        MERGE (e:Entity {name: $entity})
-                        WITH e
-                        MATCH (t:Thought {id: $thought_id})
-                        MERGE (t)-[:MENTIONS]->(e)
-                    """, entity=entity, thought_id=thought_id)
-
-                # Create tool nodes and relationships
-                for tool in thought['tools_mentioned']:
-                    session.run("""
-                        MERGE (tool:Tool {name: $tool})
-                        WITH tool
-                        MATCH (t:Thought {id: $thought_id})
-                        MERGE (t)-[:USES_TOOL]->(tool)
-                    """, tool=tool, thought_id=thought_id)
-
-            # Create relationships between thoughts
-            for rel in analyzed_data.get('relationships', []):
-                source_id = thought_ids[rel['source_thought']]
-                target_id = thought_ids[rel['target_thought']]
-
-                session.run("""
-                    MATCH (source:Thought {id: $source_id})
-                    MATCH (target:Thought {id: $target_id})
-                    MERGE (source)-[r:REASONING_FLOW {type: $rel_type}]->(target)
-                    SET r.strength = $strength
-                """, source_id=source_id, target_id=target_id,
-                            rel_type=rel['relationship'], strength=rel['strength'])
+            tx.run(_MERGE_SESSION_Q, session_id=session_id, thinking_text=thinking_text,
+                   strategy=analyzed_data.get('reasoning_strategy', 'unknown'),
+                   domain=analyzed_data.get('domain', 'general'),
+                   success_indicators=analyzed_data.get('success_indicators', [])).consume()
+
+            # Thoughts, entity mentions, tool uses and reasoning flow: one round-trip each
+            tx.run(_MERGE_THOUGHTS_Q, session_id=session_id, thoughts=thoughts).consume()
+            if mentions:
+                tx.run(_MERGE_ENTITY_NAMES_Q, names=entity_names).consume()
+                tx.run(_MERGE_ENTITIES_Q, mentions=mentions).consume()
+            if uses:
+                tx.run(_MERGE_TOOL_NAMES_Q, names=tool_names).consume()
+                tx.run(_MERGE_TOOLS_Q, uses=uses).consume()
+            if flows:
+                tx.run(_MERGE_FLOWS_Q, flows=flows).consume()
+
+        with self.driver.session() as session:
+            # One transaction for the whole session, retried by the driver on transient errors
+            if session.execute_write(write_session) is _NEEDS_BATCH_DELETE:
+                # Clear old thoughts in batches first; write_session then only removes the session node
+                session.run(_BATCH_DELETE_THOUGHTS_Q, session_id=session_id).consume()
+                session.execute_write(write_session, batch_deleted=True)
 
         return session_id
 
+    def _has_apoc(self) -> bool:
+        """Probe once whether apoc.periodic.iterate is installed"""
+        if self._apoc_available is None:
+            try:
+                with self.read_session() as session:
+                    self._apoc_available = session.run(_APOC_PROBE_Q).single()['available']
+            except Exception as e:
+                print(f"APOC probe note: {e}")
+                self._apoc_available = False
+        return self._apoc_available
+
+    def read_session(self):
+        """Open a read-only session so queries can be routed to read replicas"""
+        return self.driver.session(default_access_mode=READ_ACCESS,
+                                   fetch_size=self.fetch_size)
+
     def query_reasoning_patterns(self) -> List[Dict[str, Any]]:
         """Query for common reasoning patterns"""
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH (s:Session)
-                RETURN s.reasoning_strategy as strategy, 
-                       s.domain as domain,
-                       count(s) as frequency
-                ORDER BY frequency DESC
-            """)
-            return [record.data() for record in result]
+        with self.read_session() as session:
+            return session.execute_read(self._read_reasoning_patterns)
 
     def find_successful_patterns(self) -> List[Dict[str, Any]]:
         """Find patterns that led to successful reasoning"""
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH (s:Session)-[:CONTAINS]->(t:Thought)
-                WHERE size(s.success_indicators) > 0
-                WITH s.reasoning_strategy as strategy, s.success_indicators as indicators,
-                     collect(t.type) as thought_sequence
-                RETURN strategy, thought_sequence, indicators, count(*) as frequency
-                ORDER BY frequency DESC
-            """)
-            return [record.data() for record in result]
+        with self.read_session() as session:
+            return session.execute_read(self._read_successful_patterns)
 
     def get_tool_usage_patterns(self) -> List[Dict[str, Any]]:
         """Analyze tool usage patterns in reasoning"""
-        with self.driver.session() as session:
-            result = session.run("""
-                MATCH (t:Thought)-[:USES_TOOL]->(tool:Tool)
-                WITH tool.name as tool_name, 
-                     collect(t.type) as thought_types,
-                     count(t) as usage_count
-                RETURN tool_name, thought_types, usage_count
-                ORDER BY usage_count DESC
-            """)
-            return [record.data() for record in result]
+        with self.read_session() as session:
+            return session.execute_read(self._read_tool_usage_patterns)
+
+    def query_all_patterns(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Run every pattern query inside a single read transaction"""
+        @unit_of_work(timeout=_READ_TIMEOUT, metadata={'op': 'read_patterns'})
+        def read_all(tx):
+            return {
+                'reasoning_patterns': self._read_reasoning_patterns(tx),
+                'successful_patterns': self._read_successful_patterns(tx),
+                'tool_usage_patterns': self._read_tool_usage_patterns(tx)
+            }
+
+        with self.read_session() as session:
+            return session.execute_read(read_all)
+
+    # Async wrappers for callers that run their own event loop (ingestion scripts, ASGI hosts);
+    # the Flask app uses the sync methods. Each runs the blocking driver call in a worker thread.
+    async def aadd_thinking_session(self, session_id: str, thinking_text: str,
+                                    analyzed_data: Dict[str, Any], overwrite: bool = True) -> str:
+        return await asyncio.to_thread(self.add_thinking_session, session_id, thinking_text,
+                                       analyzed_data, overwrite)
+
+    async def aquery_reasoning_patterns(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.query_reasoning_patterns)
+
+    async def afind_successful_patterns(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.find_successful_patterns)
+
+    async def aget_tool_usage_patterns(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get_tool_usage_patterns)
+
+    async def aquery_all_patterns(self) -> Dict[str, List[Dict[str, Any]]]:
+        return await asyncio.to_thread(self.query_all_patterns)
+
+    @staticmethod
+    @unit_of_work(timeout=_READ_TIMEOUT, metadata={'op': 'reasoning_patterns'})
+    def _read_reasoning_patterns(tx) -> List[Dict[str, Any]]:
+        result = tx.run(_REASONING_PATTERNS_Q)
+        return [record.data() for record in result]
+
+    @staticmethod
+    @unit_of_work(timeout=_READ_TIMEOUT, metadata={'op': 'successful_patterns'})
+    def _read_successful_patterns(tx) -> List[Dict[str, Any]]:
+        result = tx.run(_SUCCESSFUL_PATTERNS_Q)
+        return [record.data() for record in result]
+
+    @staticmethod
+    @unit_of_work(timeout=_READ_TIMEOUT, metadata={'op': 'tool_usage_patterns'})
+    def _read_tool_usage_patterns(tx) -> List[Dict[str, Any]]:
+        result = tx.run(_TOOL_USAGE_PATTERNS_Q)
+        return [record.data() for record in result]
 
     def close(self):
         """Close the database connection"""
@@ -365,6 +622,18 @@ class AgentThinkingKG:
         self.kg_builder = KnowledgeGraphBuilder(
             self.neo4j_uri, self.neo4j_user, self.neo4j_password
         )
+        self._change_listeners: List[Callable[[str], None]] = []
+
+    def add_change_listener(self, callback: Callable[[str], None]):
+        """Register a callback invoked with the affected session id (or '*') after every graph mutation"""
+        self._change_listeners.append(callback)
+
+    def _notify_change(self, session_id: str):
+        for callback in self._change_listeners:
+            try:
+                callback(session_id)
+            except Exception as e:
+                print(f"Graph change listener failed: {e}")
 
     def process_thinking(self, thinking_text: str, session_id: str = None,
                          overwrite: bool = True) -> str:
@@ -381,79 +650,120 @@ class AgentThinkingKG:
         )
 
         print(f"Successfully processed thinking session: {result_session_id}")
+        self._notify_change(result_session_id)
         return result_session_id
 
+    async def aprocess_thinking(self, thinking_text: str, session_id: str = None,
+                                overwrite: bool = True) -> str:
+        """Async variant of process_thinking for event-loop callers (not used by the Flask app).
+
+        The blocking Neo4j write runs in a worker thread.
+        """
+        if not session_id:
+            session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+        analyzed_data = await self.analyzer.aanalyze_thinking_text(thinking_text)
+        result_session_id = await self.kg_builder.aadd_thinking_session(
+            session_id, thinking_text, analyzed_data, overwrite
+        )
+
+        print(f"Successfully processed thinking session: {result_session_id}")
+        self._notify_change(result_session_id)
+        return result_session_id
+
+    async def process_many(self, thinking_texts: List[str], max_concurrency: int = 16) -> List[str]:
+        """Process many thinking texts concurrently, with at most max_concurrency in flight.
+
+        Entry point for bulk ingestion, e.g. asyncio.run(kg.process_many(texts)).
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        # Timestamp ids have one-second resolution, so number them to keep concurrent sessions apart
+        prefix = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+        async def process_one(i: int, thinking_text: str) -> str:
+            async with semaphore:
+                return await self.aprocess_thinking(thinking_text, f"{prefix}_{i}")
+
+        return await asyncio.gather(*(process_one(i, text) for i, text in enumerate(thinking_texts)))
+
     def analyze_patterns(self, session_id: str = None) -> Dict[str, Any]:
         """Analyze reasoning patterns in the knowledge graph"""
         # Note: session_id parameter added for compatibility but not used in current implementation
-        return {
-            'reasoning_patterns': self.kg_builder.query_reasoning_patterns(),
-            'successful_patterns': self.kg_builder.find_successful_patterns(),
-            'tool_usage_patterns': self.kg_builder.get_tool_usage_patterns()
-        }
+        return self.kg_builder.query_all_patterns()
 
     def clear_database(self):
         """Clear all data from the knowledge graph (use with caution!)"""
         with self.kg_builder.driver.session() as session:
-            session.run("MATCH (n) DETACH DELETE n")
+            session.run(_CLEAR_DATABASE_Q).consume()
             print("Database cleared successfully!")
+        self._notify_change('*')
 
-    def get_session_info(self, session_id: str = None) -> List[Dict[str, Any]]:
-        """Get information about sessions in the database"""
-        with self.kg_builder.driver.session() as session:
+    def get_session_info(self, session_id: str = None, skip: int = 0,
+                         limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get information about sessions in the database, optionally one page at a time"""
+        @unit_of_work(timeout=_READ_TIMEOUT, metadata={'op': 'session_info'})
+        def read_sessions(tx):
             if session_id:
-                result = session.run("""
-                    MATCH (s:Session {id: $session_id})-[:CONTAINS]->(t:Thought)
-                    RETURN s.id as session_id, s.reasoning_strategy as strategy,
-                           collect(t.content) as thoughts
-                """, session_id=session_id)
+                result = tx.run(_SESSION_DETAIL_Q, session_id=session_id)
+            elif limit is not None:
+                result = tx.run(_SESSION_PAGE_Q, skip=skip, limit=limit)
             else:
-                result = session.run("""
-                    MATCH (s:Session)
-                    OPTIONAL MATCH (s)-[:CONTAINS]->(t:Thought)
-                    WITH s, count(t) as thought_count
-                    RETURN s.id as session_id, s.reasoning_strategy as strategy,
-                           thought_count, toString(s.timestamp) as timestamp
-                    ORDER BY s.timestamp DESC
-                """)
+                result = tx.run(_SESSION_LIST_Q)
             return [record.data() for record in result]
 
+        with self.kg_builder.read_session() as session:
+            return session.execute_read(read_sessions)
+
+    # Async wrappers for event-loop callers; see KnowledgeGraphBuilder's
+    async def aanalyze_patterns(self) -> Dict[str, Any]:
+        return await self.kg_builder.aquery_all_patterns()
+
+    async def aget_session_info(self, session_id: str = None, skip: int = 0,
+                                limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.get_session_info, session_id, skip, limit)
+
+    async def aget_full_graph_data(self, skip: int = 0,
+                                   limit: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        return await asyncio.to_thread(self.get_full_graph_data, skip, limit)
+
     def close(self):
         """Close database connections"""
         self.kg_builder.close()
 
-    def get_full_graph_data(self) -> Dict[str, List[Dict[str, Any]]]:
-        """Get all nodes and relationships for the knowledge graph visualization"""
-        with self.kg_builder.driver.session() as session:
+    def get_full_graph_data(self, skip: int = 0,
+                            limit: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Get nodes and relationships for the knowledge graph visualization.
+
+        With a limit, returns one page of nodes and every link whose source is on
+        that page, so the pages together cover the whole graph. A link's target may
+        be on another page.
+        """
+        @unit_of_work(timeout=_READ_TIMEOUT, metadata={'op': 'full_graph_data'})
+        def read_graph(tx):
+            if limit is not None:
+                nodes = [record.data() for record in tx.run(_NODE_PAGE_Q, skip=skip, limit=limit)]
+                ids = [node['id'] for node in nodes]
+                links = [record.data() for record in tx.run(_LINK_PAGE_Q, ids=ids)]
+                return {
+                    'nodes': nodes,
+                    'links': links
+                }
+
             # Fetch all nodes
-            nodes_result = session.run("MATCH (n) RETURN n")
-            nodes = []
-            for record in nodes_result:
-                node = record['n']
-                nodes.append({
-                    'id': node.element_id,
-                    'label': node.get('name') or node.get('content') or node.element_id,
-                    'type': list(node.labels)[0] if list(node.labels) else 'unknown'
-                })
+            nodes_result = tx.run(_ALL_NODES_Q)
+            nodes = [record.data() for record in nodes_result]
 
             # Fetch all relationships
-            relationships_result = session.run("MATCH (n)-[r]->(m) RETURN n, r, m")
-            links = []
-            for record in relationships_result:
-                start_node = record['n']
-                end_node = record['m']
-                relationship = record['r']
-                links.append({
-                    'source': start_node.element_id,
-                    'target': end_node.element_id,
-                    'type': relationship.type,
-                    'strength': relationship.get('strength', 1.0) # Default strength if not present
-                })
+            relationships_result = tx.run(_ALL_LINKS_Q)
+            links = [record.data() for record in relationships_result]
 
-        return {
-            'nodes': nodes,
-            'links': links
-        }
+            return {
+                'nodes': nodes,
+                'links': links
+            }
+
+        with self.kg_builder.read_session() as session:
+            return session.execute_read(read_graph)
 
 
 # Example usage
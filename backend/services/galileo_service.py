@@ -8,7 +8,12 @@ This service wraps OpenAI API calls with Galileo evaluation, providing:
 """
 
 import os
+import re
+import atexit
+import time
+import queue
 import logging
+import threading
 from typing import Dict, List, Tuple, Optional, Any
 from datetime import datetime
 from dotenv import load_dotenv
@@ -32,6 +37,51 @@ except ImportError as e:
     logger.warning(f"⚠️ Galileo SDK not available: {e}")
     logger.warning("⚠️ Will use basic evaluation instead")
 
+# Background Galileo logging: traces per flush and how long to wait to fill a batch
+GALILEO_BATCH_SIZE = 32
+GALILEO_BATCH_WAIT = 0.1
+GALILEO_QUEUE_SIZE = 1000
+# Longest a shutting-down process waits for queued traces to be flushed
+GALILEO_DRAIN_TIMEOUT = 5.0
+
+# Keep-alive pool sized for concurrent chat requests; HTTP/2 multiplexes them over few connections
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=50, max_connections=100)
+
+# Step-by-step reasoning indicators, matched case-insensitively in one scan
+STEP_INDICATOR_RE = re.compile(r"step|first|then|next|finally|therefore", re.IGNORECASE)
+
+
+def _basic_evaluation_scores(user_input: str, thoughts: str, response: str) -> Tuple[int, int, bool, bool, float]:
+    """
+    Compute the heuristic scores behind the basic evaluation.
+    
+    Returns:
+        Tuple of (reasoning_words, response_words, has_step_by_step, addresses_query, quality_score)
+    """
+    # Simple heuristic-based evaluation
+    reasoning_words = len(thoughts.split())
+    response_tokens = response.lower().split()  # split once; reused for count and overlap
+    response_words = len(response_tokens)
+    
+    # Check for step-by-step reasoning indicators
+    has_step_by_step = STEP_INDICATOR_RE.search(thoughts) is not None
+    
+    # Check if response addresses the query
+    query_words = user_input.lower().split(maxsplit=5)[:5]  # First 5 words of query
+    addresses_query = not set(response_tokens).isdisjoint(query_words)
+    
+    # Estimate quality based on length and structure
+    quality_score = 0.5  # baseline
+    if reasoning_words > 50:
+        quality_score += 0.2
+    if has_step_by_step:
+        quality_score += 0.15
+    if addresses_query:
+        quality_score += 0.15
+    quality_score = min(1.0, quality_score)
+    
+    return reasoning_words, response_words, has_step_by_step, addresses_query, quality_score
+
 
 class GalileoService:
     """
@@ -42,7 +92,7 @@ class GalileoService:
     def __init__(self):
         # Initialize OpenAI client
         try:
-            http_client = httpx.Client()
+            http_client = httpx.Client(http2=True, limits=HTTP_LIMITS)
             self.openai_client = OpenAI(
                 api_key=os.getenv("OPENAI_API_KEY"),
                 http_client=http_client
@@ -73,6 +123,15 @@ class GalileoService:
                 )
                 self.galileo_enabled = True
                 logger.info(f"✅ Galileo logger initialized for project '{project}' and stream '{log_stream}'")
+                
+                # Traces are sent by a single worker so chat replies never wait on Galileo
+                self._log_queue = queue.Queue(maxsize=GALILEO_QUEUE_SIZE)
+                threading.Thread(
+                    target=self._galileo_log_worker,
+                    name="galileo-log-worker",
+                    daemon=True
+                ).start()
+                atexit.register(self.drain_log_queue)
             except Exception as e:
                 logger.warning(f"⚠️ Galileo logger initialization failed: {e}")
                 logger.warning("⚠️ Continuing with basic evaluation")
@@ -102,8 +161,10 @@ class GalileoService:
             - response: Final answer to user
             - metadata: Evaluation scores and system info
         """
+        # Single clock read so the generated session id and metadata agree
+        now = datetime.now()
         if not session_id:
-            session_id = f"vizbrain_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            session_id = f"vizbrain_{now.strftime('%Y%m%d_%H%M%S')}"
         
         # Standard system prompt for reasoning
         system_prompt = """You are a reasoning agent that thinks step by step.
@@ -121,7 +182,7 @@ Format your response as follows:
         # Initialize metadata
         metadata = {
             "session_id": session_id,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
             "galileo_enabled": self.galileo_enabled,
             "evaluation_scores": {},
             "evaluation_feedback": {},
@@ -142,50 +203,15 @@ Format your response as follows:
                     max_tokens=1200
                 )
                 
-                # Log to Galileo using single LLM span trace
+                # Hand the trace to the background Galileo worker
                 response_content = completion.choices[0].message.content
                 
                 try:
-                    logger.info(f"🔬 Starting Galileo logging for session {session_id}")
-                    
-                    # Create a trace with LLM span for Galileo
-                    trace = self.galileo_logger.start_trace(
-                        input=user_input,
-                        name=f"VizBrain Chat - {session_id[-8:]}"
-                    )
-                    logger.info(f"✅ Trace created with ID: {trace.id if hasattr(trace, 'id') else 'Unknown'}")
-                    
-                    # Add LLM span
-                    llm_span = self.galileo_logger.add_llm_span(
-                        input=user_input,
-                        output=response_content,
-                        model="gpt-3.5-turbo",
-                        temperature=0.7,
-                        num_input_tokens=completion.usage.prompt_tokens if completion.usage else None,
-                        num_output_tokens=completion.usage.completion_tokens if completion.usage else None,
-                        total_tokens=completion.usage.total_tokens if completion.usage else None
-                    )
-                    logger.info(f"✅ LLM span added")
-                    
-                    # Conclude the trace
-                    self.galileo_logger.conclude(output=response_content)
-                    logger.info(f"✅ Trace concluded")
-                    
-                    # Flush to send to Galileo
-                    logger.info(f"📤 Flushing to Galileo...")
-                    flush_result = self.galileo_logger.flush()
-                    logger.info(f"📤 Flush completed: {len(flush_result)} traces sent")
-                    
+                    self._log_queue.put_nowait((session_id, user_input, response_content, completion.usage))
                     metadata["galileo_logged"] = True
-                    metadata["galileo_trace_id"] = str(trace.id) if hasattr(trace, 'id') else None
-                    metadata["traces_sent"] = len(flush_result)
-                    logger.info(f"✅ Galileo logging completed: {len(flush_result)} traces sent for session {session_id}")
-                    
-                except Exception as log_error:
-                    logger.error(f"❌ Galileo logging failed: {log_error}")
-                    logger.error(f"❌ Error details: {type(log_error).__name__}: {str(log_error)}")
-                    import traceback
-                    logger.error(f"❌ Full traceback: {traceback.format_exc()}")
+                    logger.info(f"📤 Queued Galileo trace for session {session_id}")
+                except queue.Full:
+                    logger.warning(f"⚠️ Galileo log queue full, dropping trace for session {session_id}")
                     metadata["galileo_logged"] = False
                 
             except Exception as e:
@@ -224,6 +250,70 @@ Format your response as follows:
         logger.info(f"✅ Response generated for session {session_id}")
         return thoughts, response, metadata
     
+    def _galileo_log_worker(self) -> None:
+        """
+        Drain queued chat interactions and send them to Galileo in batches.
+        
+        Waits up to GALILEO_BATCH_WAIT seconds to collect GALILEO_BATCH_SIZE
+        traces, then flushes them in a single call.
+        """
+        while True:
+            batch = [self._log_queue.get()]
+            deadline = time.monotonic() + GALILEO_BATCH_WAIT
+            while len(batch) < GALILEO_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._log_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            for session_id, user_input, output, usage in batch:
+                try:
+                    self.galileo_logger.start_trace(
+                        input=user_input,
+                        name=f"VizBrain Chat - {session_id[-8:]}"
+                    )
+                    self.galileo_logger.add_llm_span(
+                        input=user_input,
+                        output=output,
+                        model="gpt-3.5-turbo",
+                        temperature=0.7,
+                        num_input_tokens=usage.prompt_tokens if usage else None,
+                        num_output_tokens=usage.completion_tokens if usage else None,
+                        total_tokens=usage.total_tokens if usage else None
+                    )
+                    self.galileo_logger.conclude(output=output)
+                except Exception as e:
+                    logger.error(f"❌ Galileo trace failed for session {session_id}: {type(e).__name__}: {e}")
+            
+            try:
+                flush_result = self.galileo_logger.flush()
+                logger.info(f"📤 Flush completed: {len(flush_result)} traces sent")
+            except Exception as e:
+                logger.error(f"❌ Galileo flush failed: {type(e).__name__}: {e}")
+            finally:
+                for _ in batch:
+                    self._log_queue.task_done()
+    
+    def drain_log_queue(self, timeout: float = GALILEO_DRAIN_TIMEOUT) -> None:
+        """
+        Wait for queued traces to be flushed to Galileo before the process exits.
+        
+        Registered with atexit; the worker thread keeps flushing while this waits.
+        
+        Args:
+            timeout: Maximum seconds to wait
+        """
+        if not self.galileo_enabled:
+            return
+        deadline = time.monotonic() + timeout
+        while self._log_queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if self._log_queue.unfinished_tasks:
+            logger.warning(f"⚠️ Exiting with {self._log_queue.unfinished_tasks} Galileo traces unsent")
+    
     def _parse_thinking_response(self, response_text: str) -> Tuple[str, str]:
         """
         Parse AI response to extract thinking and final answer.
@@ -235,9 +325,10 @@ Format your response as follows:
             Tuple of (thoughts, response)
         """
         if "<think>" in response_text and "</think>" in response_text:
-            parts = response_text.split("</think>")
-            thoughts = parts[0].replace("<think>", "").strip()
-            response = parts[1].strip() if len(parts) > 1 else ""
+            # partition stops at the first closing tag instead of splitting the whole text
+            head, _, tail = response_text.partition("</think>")
+            thoughts = head.replace("<think>", "").strip()
+            response = tail.strip()
         else:
             # Fallback: create basic reasoning note
             thoughts = f"Processing user query: {response_text[:100]}..."
@@ -262,29 +353,8 @@ Format your response as follows:
         Returns:
             Dictionary of basic evaluation metrics
         """
-        # Simple heuristic-based evaluation
-        reasoning_words = len(thoughts.split())
-        response_words = len(response.split())
-        
-        # Check for step-by-step reasoning indicators
-        has_step_by_step = any(indicator in thoughts.lower() for indicator in [
-            "step", "first", "then", "next", "finally", "therefore"
-        ])
-        
-        # Check if response addresses the query
-        query_words = set(user_input.lower().split()[:5])  # First 5 words of query
-        response_words_set = set(response.lower().split())
-        addresses_query = len(query_words.intersection(response_words_set)) > 0
-        
-        # Estimate quality based on length and structure
-        quality_score = 0.5  # baseline
-        if reasoning_words > 50:
-            quality_score += 0.2
-        if has_step_by_step:
-            quality_score += 0.15
-        if addresses_query:
-            quality_score += 0.15
-        quality_score = min(1.0, quality_score)
+        reasoning_words, response_words, has_step_by_step, addresses_query, quality_score = \
+            _basic_evaluation_scores(user_input, thoughts, response)
         
         return {
             "reasoning_words": reasoning_words,
@@ -297,10 +367,13 @@ Format your response as follows:
             "complexity_score": min(1.0, reasoning_words / 100.0)
         }
     
-    def health_check(self) -> Dict[str, Any]:
+    def health_check(self, timestamp: Optional[str] = None) -> Dict[str, Any]:
         """
         Check health status of all service components.
         
+        Args:
+            timestamp: Optional ISO timestamp shared with the caller's response
+            
         Returns:
             Dictionary with health status information
         """
@@ -314,7 +387,7 @@ Format your response as follows:
             },
             "service_ready": bool(self.openai_client),
             "evaluation_mode": "galileo" if self.galileo_enabled else "basic",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": timestamp or datetime.now().isoformat()
         }
         
         return health
@@ -100,8 +100,8 @@ class ApiService {
     return response.json();
   }
 
-  async getSessions(): Promise<{ sessions: any[] }> {
-    const response = await fetch(`${this.baseUrl}/api/sessions`);
+  async getSessions(page = 1, size = 50): Promise<{ sessions: any[]; page: number; size: number; has_more: boolean }> {
+    const response = await fetch(`${this.baseUrl}/api/sessions?page=${page}&size=${size}`);
     if (!response.ok) {
       throw new Error(`Get sessions request failed: ${response.statusText}`);
     }